@@ -1,6 +1,17 @@
-from langchain.prompts import PromptTemplate
-from langchain_ollama import OllamaLLM
-from functions import create_quick_pr, configure_target_repo
+# Ollama server setup: OLLAMA_NUM_PARALLEL and OLLAMA_MAX_LOADED_MODELS are read
+# by the Ollama server, not this client, so export them before `ollama serve`:
+#   OLLAMA_NUM_PARALLEL=4 OLLAMA_MAX_LOADED_MODELS=2 ollama serve
+# This lets concurrent requests be batched instead of queued one at a time.
+import asyncio
+import os
+import re
+import threading
+import ollama
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_ollama import ChatOllama
+from functions import acreate_quick_prs, create_quick_pr, configure_target_repo
+from llm_cache import configure_llm_cache, is_truncated
 
 # Load environment variables from .env file
 try:
@@ -11,81 +22,315 @@ except ImportError:
     print("Warning: python-dotenv not installed. Install with: pip install python-dotenv")
     print("Environment variables will only be loaded from system environment.")
 
-# Optional: Allow user to override target repository
-import os
-current_repo = os.getenv('GITHUB_REPO', 'Gerthum/task-tracker')
-print(f"Target repository: {current_repo}")
-change_repo = input(f"Change target repository? (current: {current_repo}) [y/N]: ").lower().strip()
-if change_repo in ['y', 'yes']:
-    new_repo = input("Enter repository (owner/repo): ").strip()
-    new_branch = input("Enter default branch [main]: ").strip() or "main"
-    configure_target_repo(new_repo, new_branch)
-
-# Use CodeLlama:7B via Ollama
-llm = OllamaLLM(model="codellama:7b")
-
-# Define the prompt template for code generation
-prompt = PromptTemplate(
-    input_variables=["user_request"],
-    template="Write Python code for the following request in a microservice format. Start with a brief comment explaining what the microservice does, then provide only executable Python code structured as a microservice with:\n\n- FastAPI or Flask framework\n- Proper API endpoints\n- Request/response models\n- Error handling\n- Main function to run the service\n\nRequest: {user_request}\n\nFormat your response as complete Python microservice code with comments at the beginning explaining the functionality."
-)
-
-# Define the prompt template for filename suggestion
-filename_prompt = PromptTemplate(
-    input_variables=["user_request"],
-    template="Based on this request: '{user_request}', suggest a good Python filename for a microservice. Respond with only the filename ending in .py, nothing else. Example format: user_service.py"
-)
-
-# Combine prompts and LLM into runnable chains
-code_chain = prompt | llm
-filename_chain = filename_prompt | llm
+# Cache LLM responses so repeated (and, with REDIS_URL set, paraphrased)
+# requests skip generation
+llm_cache, exact_cache = configure_llm_cache()
 
-# Get user input
-user_input = input("Describe the Python code you want: ")
+# Use a Q4_K_M-quantized CodeLlama:7B via Ollama (override with OLLAMA_MODEL,
+# e.g. codellama:7b-instruct-q5_K_M if output quality regresses); a 2048-token
+# context caps KV-cache memory per parallel slot
+MODEL = os.getenv('OLLAMA_MODEL', 'codellama:7b-instruct-q4_K_M')
+NUM_CTX = 2048
+# Keep the model loaded between requests instead of Ollama's 5 minute default
+KEEP_ALIVE = "1h"
 
-# Get suggested filename from LLM
-print("\nGenerating filename suggestion...")
-suggested_filename = filename_chain.invoke({"user_request": user_input}).strip()
+# For multi-user deployments set LLM_BACKEND=vllm to use an OpenAI-compatible
+# vLLM server, whose continuous batching serves concurrent requests far better
+# than Ollama's per-model slots. Start it with prefix caching enabled:
+#   python -m vllm.entrypoints.openai.api_server --model codellama/CodeLlama-7b-Instruct-hf --enable-prefix-caching
+BACKEND = os.getenv('LLM_BACKEND', 'ollama').lower()
+if BACKEND not in ['ollama', 'vllm']:
+    raise ValueError(f"Unknown LLM_BACKEND '{BACKEND}'. Use 'ollama' or 'vllm'")
+GENERATED_BY = "CodeLlama via vLLM" if BACKEND == 'vllm' else "CodeLlama via Ollama"
 
-# Clean up the suggested filename (remove any extra text)
-if suggested_filename.endswith('.py'):
-    suggested_filename = suggested_filename
-else:
-    suggested_filename = suggested_filename + '.py'
+# Decode time dominates each request, so bound the output per microservice
+NUM_PREDICT = 1024
 
-# Ask user for filename with suggestion
-filename_input = input(f"Enter filename (press Enter to use '{suggested_filename}'): ").strip()
-filename = filename_input if filename_input else suggested_filename
+# Token budget left for the system prompt and request within NUM_CTX
+PROMPT_TOKENS = NUM_CTX - NUM_PREDICT
 
-print(f"Using filename: {filename}")
+# Larger batches give diminishing returns and longer waits for the first file
+MAX_BATCH_SIZE = 4
 
-# Run the chain and print the output
-output = code_chain.invoke({"user_request": user_input})
+# Ollama does not stop at num_ctx: it shifts the window and keeps decoding,
+# dropping the instructions. The batch model therefore gets a context sized
+# for the prompt plus every service's output. Ollama reloads the model when
+# num_ctx changes, so switching between single and batch requests costs a load.
+BATCH_NUM_CTX = PROMPT_TOKENS + NUM_PREDICT * MAX_BATCH_SIZE
 
-print("\nGenerated Python Code:\n")
-print(output)
 
-# Ask if user wants to create a PR
-create_pr = input("\nDo you want to create a GitHub PR with this code? (y/n): ").lower().strip()
+def make_llm(num_predict, num_ctx=NUM_CTX, cache=None):
+    """Create the chat model for the configured backend, capped at num_predict output tokens (cache=None uses the global LLM cache)."""
+    if BACKEND == 'vllm':
+        from langchain_openai import ChatOpenAI  # pip install langchain-openai
 
-if create_pr in ['y', 'yes']:
-    try:
-        # Create description for the PR
-        pr_description = f"Auto-generated microservice code for: {user_input}\n\nGenerated using CodeLlama via Ollama."
-        
-        # Create the PR
-        print("\nCreating GitHub Pull Request...")
-        pr_url = create_quick_pr(
-            code=output,
-            filename=filename,
-            description=pr_description
+        return ChatOpenAI(
+            model=os.getenv('VLLM_MODEL', 'codellama/CodeLlama-7b-Instruct-hf'),
+            base_url=os.getenv('VLLM_BASE_URL', 'http://localhost:8000/v1'),
+            api_key="EMPTY",
+            streaming=True,  # Emit tokens to callbacks during ainvoke
+            max_tokens=num_predict,
+            cache=cache
         )
-        
-        print(f"Pull Request created successfully!")
-        print(f"PR URL: {pr_url}")
-        
-    except Exception as e:
-        print(f"Failed to create PR: {str(e)}")
-        print("Make sure your .env file has GITHUB_TOKEN and GITHUB_REPO set correctly")
-else:
-    print("Code generated successfully. No PR created.")
\ No newline at end of file
+    return ChatOllama(model=MODEL, num_ctx=num_ctx, keep_alive=KEEP_ALIVE, num_predict=num_predict, cache=cache)
+
+
+llm = make_llm(NUM_PREDICT)
+# A batch response holds several services, so it gets a proportionally larger
+# output budget and a context that fits it. It only uses the exact-match cache:
+# the same requests in another order embed almost identically, and a semantic
+# hit would number the files against the wrong requests.
+batch_llm = make_llm(NUM_PREDICT * MAX_BATCH_SIZE, num_ctx=BATCH_NUM_CTX, cache=exact_cache)
+
+# The fixed instructions go in the system message and the request in the user
+# message, so every prompt starts with the same tokens and Ollama can reuse the
+# cached KV state for that prefix; only the request itself needs prefilling
+prompt = ChatPromptTemplate.from_messages([
+    ("system", "Write Python code for the following request in a microservice format. Start with a brief comment explaining what the microservice does, then provide only executable Python code structured as a microservice with:\n\n- FastAPI or Flask framework\n- Proper API endpoints\n- Request/response models\n- Error handling\n- Main function to run the service\n\nFormat your response as complete Python microservice code with comments at the beginning explaining the functionality."),
+    ("human", "Request: {user_request}")
+])
+
+# Define the prompt template for generating several microservices in one call;
+# sharing one prompt amortizes prefill and request overhead across services
+batch_prompt = ChatPromptTemplate.from_messages([
+    ("system", "Write Python code for each of the following requests in a microservice format. For each request, output a line of the form '### FILE <number>: <filename>.py', where <number> is the request's number, followed by a brief comment explaining what the microservice does, then only executable Python code structured as a microservice with:\n\n- FastAPI or Flask framework\n- Proper API endpoints\n- Request/response models\n- Error handling\n- Main function to run the service\n\nFormat your response as one '### FILE <number>:' section per request, with no other text between sections."),
+    ("human", "Requests:\n{user_requests}")
+])
+
+# Combine prompts and LLM into runnable chains; they return the model's
+# message so its metadata can show whether the output was cut off
+code_chain = prompt | llm
+batch_chain = batch_prompt | batch_llm
+
+# Longest request text sent to the model (roughly 800 tokens, leaving room for
+# the system prompt within PROMPT_TOKENS). A batch shares this budget across
+# its services.
+MAX_REQUEST_CHARS = 3200
+
+FILE_MARKER = re.compile(r'^### FILE (\d+):\s*(\S+?\.py)\s*$', re.MULTILINE)
+
+
+def warm_up_model():
+    """Load the model into memory so the first real request skips load_duration."""
+    try:
+        # An empty prompt only loads the model; it bypasses the LLM cache and
+        # uses the same num_ctx so Ollama does not reload for the real request
+        ollama.Client().generate(model=MODEL, keep_alive=KEEP_ALIVE, options={"num_ctx": NUM_CTX})
+    except Exception:
+        pass  # Any connection problem is reported by the real request
+
+
+def suggest_filename(user_request):
+    """Suggest a filename derived from the request itself (no extra LLM call)."""
+    return (re.sub(r'[^a-z0-9]+', '_', user_request.lower()).strip('_')[:40] or "microservice") + '.py'
+
+
+def split_files(output):
+    """Split batch output into (number, filename, code) tuples on '### FILE <n>:' markers."""
+    parts = FILE_MARKER.split(output)
+    return [(int(parts[i]), parts[i + 1], parts[i + 2].strip()) for i in range(1, len(parts) - 2, 3)]
+
+
+def cap_request(user_request, max_chars=MAX_REQUEST_CHARS):
+    """Cut very long requests, since prefill cost grows with prompt length."""
+    if len(user_request) > max_chars:
+        print(f"Warning: request is {len(user_request)} characters; only the first {max_chars} will be used.")
+        return user_request[:max_chars]
+    return user_request
+
+
+def read_batch_requests():
+    """Ask for one service description per line until an empty line."""
+    user_requests = []
+    while True:
+        user_request = input(f"Service {len(user_requests) + 1} (press Enter when done): ").strip()
+        if not user_request:
+            return user_requests
+        user_requests.append(user_request)
+
+
+class QueueTokenHandler(AsyncCallbackHandler):
+    """Forward tokens from the model to a queue as they are generated."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.streamed = False
+
+    async def on_llm_new_token(self, token, **kwargs):
+        self.streamed = True
+        self.queue.put_nowait(token)
+
+
+def start_generation(chain, inputs):
+    """Start running a chain in the background, buffering its chunks in a queue."""
+    queue = asyncio.Queue()
+
+    async def produce():
+        # ainvoke (unlike astream) goes through the LLM cache: a hit returns
+        # the stored output at once, a miss streams tokens via the callback
+        handler = QueueTokenHandler(queue)
+        try:
+            message = await chain.ainvoke(inputs, config={"callbacks": [handler]})
+            if not handler.streamed:
+                queue.put_nowait(message.content)  # Served from the cache
+            return message
+        finally:
+            queue.put_nowait(None)
+
+    return asyncio.create_task(produce()), queue
+
+
+async def stream_output(generation):
+    """Print a generation's chunks as they arrive and return (output, truncated)."""
+    task, queue = generation
+    while (chunk := await queue.get()) is not None:
+        print(chunk, end="", flush=True)
+    print()
+    message = await task  # Re-raises any error from the chain
+    truncated = is_truncated(message.response_metadata)
+    if truncated:
+        print("\nWarning: output hit the token limit and is incomplete. It was not cached; try a shorter or narrower request.")
+    return message.content, truncated
+
+
+async def generate_batch(user_requests):
+    """Generate several microservices with one prompt per batch and open a PR for each."""
+    files = []
+    for start in range(0, len(user_requests), MAX_BATCH_SIZE):
+        batch = user_requests[start:start + MAX_BATCH_SIZE]
+        numbered = "\n".join(f"{i}. {request}" for i, request in enumerate(batch, 1))
+
+        print(f"\nGenerated Python Code ({len(batch)} services):\n")
+        output, truncated = await stream_output(start_generation(batch_chain, {"user_requests": numbered}))
+        if truncated:
+            print("Skipping PRs for this batch.")
+            continue
+
+        # Sections are matched to requests by number; if any are missing,
+        # duplicated or unexpected, no PRs are made for this batch rather
+        # than risk pairing code with another request's description
+        batch_files = split_files(output)
+        numbers = sorted(number for number, _, _ in batch_files)
+        if numbers != list(range(1, len(batch) + 1)):
+            print(f"Warning: expected file sections 1-{len(batch)} but found {numbers or 'none'}. Skipping PRs for this batch.")
+            continue
+        for number, filename, code in sorted(batch_files):
+            request = batch[number - 1]
+            files.append({
+                "code": code,
+                "filename": filename,
+                "description": f"Auto-generated microservice code for: {request}\n\nGenerated using {GENERATED_BY}."
+            })
+
+    if not files:
+        print("No usable files were generated. No PRs created.")
+        return
+
+    print("\nGenerated files: " + ", ".join(f["filename"] for f in files))
+    create_pr = input(f"\nDo you want to create {len(files)} GitHub PRs with this code? (y/n): ").lower().strip()
+
+    if create_pr in ['y', 'yes']:
+        print("\nCreating GitHub Pull Requests...")
+        results = await acreate_quick_prs(files)
+        for file, result in zip(files, results):
+            if isinstance(result, Exception):
+                print(f"Failed to create PR for {file['filename']}: {str(result)}")
+            else:
+                print(f"PR URL ({file['filename']}): {result}")
+    else:
+        print("Code generated successfully. No PRs created.")
+
+
+async def generate_single(user_input):
+    """Generate one microservice and optionally open a PR for it."""
+    # Start generating right away so the code is being written while the user
+    # confirms the filename; output is buffered until it can be printed
+    generation = start_generation(code_chain, {"user_request": user_input})
+
+    suggested_filename = suggest_filename(user_input)
+
+    # Ask user for filename with suggestion (in a thread, so the generation
+    # keeps running while we wait)
+    filename_input = (await asyncio.to_thread(input, f"Enter filename (press Enter to use '{suggested_filename}'): ")).strip()
+    filename = filename_input if filename_input else suggested_filename
+
+    print(f"Using filename: {filename}")
+
+    # Print the buffered output, then the remaining tokens as they arrive
+    print("\nGenerated Python Code:\n")
+    output, truncated = await stream_output(generation)
+    if truncated:
+        print("No PR created.")
+        return
+
+    # Ask if user wants to create a PR
+    create_pr = input("\nDo you want to create a GitHub PR with this code? (y/n): ").lower().strip()
+
+    if create_pr in ['y', 'yes']:
+        try:
+            # Create description for the PR
+            pr_description = f"Auto-generated microservice code for: {user_input}\n\nGenerated using {GENERATED_BY}."
+
+            # Create the PR
+            print("\nCreating GitHub Pull Request...")
+            pr_url = create_quick_pr(
+                code=output,
+                filename=filename,
+                description=pr_description
+            )
+
+            print(f"Pull Request created successfully!")
+            print(f"PR URL: {pr_url}")
+
+        except Exception as e:
+            print(f"Failed to create PR: {str(e)}")
+            print("Make sure your .env file has GITHUB_TOKEN and GITHUB_REPO set correctly")
+    else:
+        print("Code generated successfully. No PR created.")
+
+
+async def main():
+    # Start loading the model while the user is still answering prompts
+    # (vLLM keeps its model loaded for as long as the server runs)
+    if BACKEND == 'ollama':
+        threading.Thread(target=warm_up_model, daemon=True).start()
+
+    # Optional: Allow user to override target repository
+    current_repo = os.getenv('GITHUB_REPO', 'Gerthum/task-tracker')
+    print(f"Target repository: {current_repo}")
+    change_repo = input(f"Change target repository? (current: {current_repo}) [y/N]: ").lower().strip()
+    if change_repo in ['y', 'yes']:
+        new_repo = input("Enter repository (owner/repo): ").strip()
+        new_branch = input("Enter default branch [main]: ").strip() or "main"
+        configure_target_repo(new_repo, new_branch)
+
+    # Keep serving requests so the prompts, LLM client and loaded model are
+    # reused instead of being set up again for every microservice
+    while True:
+        # Get user input
+        user_input = input("\nDescribe the Python code you want (type 'batch' to describe several services, press Enter to quit): ").strip()
+        if not user_input:
+            break
+
+        # A failed request (e.g. the model server is unreachable) is reported
+        # and the loop carries on with the next one
+        try:
+            # Several services are entered one per line and generated together
+            # in one batched prompt
+            if user_input.lower() == 'batch':
+                user_requests = read_batch_requests()
+                if not user_requests:
+                    continue
+                if len(user_requests) > 1:
+                    # Services in a batch share one request budget
+                    await generate_batch([cap_request(request, MAX_REQUEST_CHARS // MAX_BATCH_SIZE) for request in user_requests])
+                else:
+                    await generate_single(cap_request(user_requests[0]))
+            else:
+                await generate_single(cap_request(user_input))
+        except Exception as e:
+            print(f"\nFailed to generate code: {str(e)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
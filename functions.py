@@ -29,12 +29,63 @@ Usage examples:
        filename="utils.py",
        description="Add utility function"
    )
+
+3. Concurrent PRs (requires: pip install gidgethub aiohttp):
+   pr_urls = await acreate_quick_prs([
+       {"code": "def add(a, b): return a + b", "filename": "add.py"},
+       {"code": "def sub(a, b): return a - b", "filename": "sub.py"}
+   ])
 """
 
 import os
-import base64
-from github import Github  # pip install PyGithub
-from typing import Optional
+import asyncio
+import itertools
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+# PyGithub is imported where it is used, so loading this module (and starting
+# the app) does not pay for it unless a PR is actually created
+if TYPE_CHECKING:
+    import aiohttp
+    from github import Github
+    from github.Repository import Repository
+
+# Clients and repositories are reused across PR creations so repeated calls
+# share one connection pool and skip the get_repo round-trip
+_gh_clients: Dict[str, "Github"] = {}
+_repo_cache: Dict[Tuple[str, str], "Repository"] = {}
+
+
+def _get_repo(token: str, repo_name: str) -> "Repository":
+    """
+    Return a cached repository object, creating the client and repo on first use.
+    
+    Args:
+        token (str): GitHub personal access token
+        repo_name (str): Repository name in format 'owner/repo'
+    
+    Returns:
+        Repository: The PyGithub repository object
+    """
+    from github import Github  # pip install PyGithub
+    from urllib3.util.retry import Retry
+    
+    client = _gh_clients.get(token)
+    if client is None:
+        # Retry transient server errors and rate limiting with exponential
+        # backoff inside the client, instead of failing the whole PR
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["GET", "POST", "PUT", "PATCH"])
+        )
+        client = _gh_clients[token] = Github(token, per_page=100, retry=retry, pool_size=10)
+    
+    key = (token, repo_name)
+    repo = _repo_cache.get(key)
+    if repo is None:
+        repo = _repo_cache[key] = client.get_repo(repo_name)
+    return repo
 
 
 def configure_target_repo(repo_name: str, default_branch: str = "main", github_token: Optional[str] = None):
@@ -84,6 +135,8 @@ def create_github_pr_with_code(
     Raises:
         Exception: If GitHub operations fail
     """
+    from github import InputGitTreeElement  # pip install PyGithub
+    
     try:
         # Get GitHub token from parameter or environment variable
         token = github_token or os.getenv('GITHUB_TOKEN')
@@ -94,12 +147,9 @@ def create_github_pr_with_code(
         if target_branch is None:
             target_branch = os.getenv('DEFAULT_BRANCH', 'main')
         
-        # Initialize GitHub client
-        g = Github(token)
-        
-        # Get the repository
+        # Get the repository (client and repo are cached per token)
         try:
-            repo = g.get_repo(repo_name)
+            repo = _get_repo(token, repo_name)
             print(f"✓ Connected to repository: {repo_name}")
         except Exception as e:
             raise Exception(f"Repository '{repo_name}' not found or access denied. Error: {str(e)}")
@@ -109,36 +159,27 @@ def create_github_pr_with_code(
             source_branch = repo.get_branch(target_branch)
             print(f"✓ Found target branch: {target_branch}")
         except Exception as e:
-            # List available branches for debugging
-            branches = [branch.name for branch in repo.get_branches()]
-            raise Exception(f"Branch '{target_branch}' not found. Available branches: {', '.join(branches[:5])}. Error: {str(e)}")
+            # List a few available branches for debugging (first page only)
+            branches = [branch.name for branch in itertools.islice(repo.get_branches(), 5)]
+            raise Exception(f"Branch '{target_branch}' not found. Available branches: {', '.join(branches)}. Error: {str(e)}")
+        
+        # Commit the file on top of the target branch with the Git Data API:
+        # tree (with the file content inline) -> commit, then point the new
+        # branch at the commit. Works the same whether the file exists or not,
+        # so no get_contents.
+        base_commit = repo.get_git_commit(source_branch.commit.sha)
+        tree = repo.create_git_tree(
+            [InputGitTreeElement(filename, "100644", "blob", content=code)],
+            base_tree=base_commit.tree
+        )
+        commit = repo.create_git_commit(commit_message, tree, [base_commit])
         
-        # Create a new branch
+        # Create the new branch at the commit
         repo.create_git_ref(
             ref=f"refs/heads/{branch_name}",
-            sha=source_branch.commit.sha
+            sha=commit.sha
         )
         
-        # Check if file exists
-        try:
-            existing_file = repo.get_contents(filename, ref=branch_name)
-            # Update existing file
-            repo.update_file(
-                path=filename,
-                message=commit_message,
-                content=code,
-                sha=existing_file.sha,
-                branch=branch_name
-            )
-        except:
-            # Create new file
-            repo.create_file(
-                path=filename,
-                message=commit_message,
-                content=code,
-                branch=branch_name
-            )
-        
         # Create pull request
         pr = repo.create_pull(
             title=pr_title,
@@ -153,48 +194,132 @@ def create_github_pr_with_code(
         raise Exception(f"Failed to create GitHub PR: {str(e)}")
 
 
-def create_quick_pr(code: str, filename: str, description: str = "Auto-generated code") -> str:
+def _find_git_config() -> Optional[str]:
     """
-    Simplified function to create a PR with minimal parameters.
-    Uses environment variables for configuration.
+    Find the config file of the git repository containing the current directory.
     
-    Args:
-        code (str): The code content
-        filename (str): Name of the file to create
-        description (str): Brief description of the changes
+    Returns:
+        str: Path to the config file, or None if not inside a repository
+    """
+    directory = os.path.abspath(os.getcwd())
+    while True:
+        git_path = os.path.join(directory, '.git')
+        if os.path.isdir(git_path):
+            return os.path.join(git_path, 'config')
+        if os.path.isfile(git_path):
+            # Worktree or submodule: '.git' holds 'gitdir: <path>', and a
+            # worktree's gitdir points back to the shared repository
+            with open(git_path) as f:
+                git_dir = f.read().strip().split('gitdir:', 1)[-1].strip()
+            git_dir = os.path.join(directory, git_dir)
+            commondir_path = os.path.join(git_dir, 'commondir')
+            if os.path.isfile(commondir_path):
+                with open(commondir_path) as f:
+                    git_dir = os.path.join(git_dir, f.read().strip())
+            return os.path.join(git_dir, 'config')
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _read_origin_url() -> Optional[str]:
+    """
+    Get the URL of the 'origin' remote, reading the git config directly when
+    possible to avoid spawning a git process.
     
     Returns:
-        str: URL of the created pull request
+        str: The remote URL, or None if it cannot be determined
     """
-    import datetime
+    try:
+        import configparser
+        config_path = _find_git_config()
+        if config_path:
+            # Git configs repeat keys (e.g. several 'fetch' lines) and URLs may
+            # contain '%', so disable strict parsing and interpolation
+            config = configparser.ConfigParser(strict=False, interpolation=None)
+            config.read(config_path)
+            url = config.get('remote "origin"', 'url', fallback=None)
+            if url:
+                return url
+    except Exception:
+        pass
     
-    # Generate automatic names
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    branch_name = f"feature/auto_generated_{timestamp}"
-    pr_title = f"Add {filename}"
-    commit_message = f"Add auto-generated {filename}"
+    # Fall back to asking git
+    import subprocess
+    result = subprocess.run(['git', 'remote', 'get-url', 'origin'], 
+                          capture_output=True, text=True)
+    if result.returncode == 0:
+        return result.stdout.strip()
+    return None
+
+
+def _resolve_repo_name() -> str:
+    """
+    Get the target repository from the environment or the current git remote.
+    
+    Returns:
+        str: Repository name in format 'owner/repo'
     
+    Raises:
+        ValueError: If no repository can be determined
+    """
     # Get repo name from environment or current directory
     repo_name = os.getenv('GITHUB_REPO')
     if not repo_name:
         # Try to extract from git remote (if available)
         try:
-            import subprocess
-            result = subprocess.run(['git', 'remote', 'get-url', 'origin'], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                url = result.stdout.strip()
-                # Extract owner/repo from git URL
-                if 'github.com' in url:
-                    if url.startswith('git@'):
-                        repo_name = url.split(':')[1].replace('.git', '')
-                    else:
-                        repo_name = '/'.join(url.split('/')[-2:]).replace('.git', '')
+            url = _read_origin_url()
+            # Extract owner/repo from git URL
+            if url and 'github.com' in url:
+                if url.startswith('git@'):
+                    repo_name = url.split(':')[1].replace('.git', '')
+                else:
+                    repo_name = '/'.join(url.split('/')[-2:]).replace('.git', '')
         except:
             pass
     
     if not repo_name:
         raise ValueError("Repository name not found. Set GITHUB_REPO environment variable or run from a git repository")
+    return repo_name
+
+
+def _quick_pr_names(filename: str) -> Tuple[str, str, str]:
+    """
+    Generate the branch name, PR title and commit message for a quick PR.
+    
+    Args:
+        filename (str): Name of the file being added
+    
+    Returns:
+        tuple: (branch_name, pr_title, commit_message)
+    """
+    import datetime
+    
+    # Microseconds keep branch names unique when several PRs are created at once
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    branch_name = f"feature/auto_generated_{timestamp}"
+    pr_title = f"Add {filename}"
+    commit_message = f"Add auto-generated {filename}"
+    return branch_name, pr_title, commit_message
+
+
+def create_quick_pr(code: str, filename: str, description: str = "Auto-generated code") -> str:
+    """
+    Simplified function to create a PR with minimal parameters.
+    Uses environment variables for configuration.
+    
+    Args:
+        code (str): The code content
+        filename (str): Name of the file to create
+        description (str): Brief description of the changes
+    
+    Returns:
+        str: URL of the created pull request
+    """
+    # Generate automatic names
+    branch_name, pr_title, commit_message = _quick_pr_names(filename)
+    repo_name = _resolve_repo_name()
     
     return create_github_pr_with_code(
         code=code,
@@ -204,4 +329,115 @@ def create_quick_pr(code: str, filename: str, description: str = "Auto-generated
         pr_description=description,
         branch_name=branch_name,
         commit_message=commit_message
-    )
\ No newline at end of file
+    )
+
+
+async def acreate_quick_pr(
+    code: str,
+    filename: str,
+    description: str = "Auto-generated code",
+    session: Optional["aiohttp.ClientSession"] = None,
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> str:
+    """
+    Async version of create_quick_pr using gidgethub + aiohttp.
+    Runs the tree/commit/ref/PR sequence without blocking, so several PRs
+    can be created concurrently with asyncio.gather.
+    
+    Unlike the PyGithub path, requests are not retried: a transient error
+    fails this PR only, and acreate_quick_prs reports it alongside the
+    others so it can be rerun.
+    
+    Args:
+        code (str): The code content
+        filename (str): Name of the file to create
+        description (str): Brief description of the changes
+        session (aiohttp.ClientSession, optional): Session to reuse. If None, a new one is opened
+        semaphore (asyncio.Semaphore, optional): Limits how many PRs are created at once
+    
+    Returns:
+        str: URL of the created pull request
+        
+    Raises:
+        Exception: If GitHub operations fail
+    """
+    import aiohttp  # pip install aiohttp
+    from gidgethub import BadRequest  # pip install gidgethub
+    from gidgethub.aiohttp import GitHubAPI
+    
+    token = os.getenv('GITHUB_TOKEN')
+    if not token:
+        raise ValueError("GitHub token is required. Set GITHUB_TOKEN environment variable")
+    repo_name = _resolve_repo_name()
+    target_branch = os.getenv('DEFAULT_BRANCH', 'main')
+    branch_name, pr_title, commit_message = _quick_pr_names(filename)
+    
+    async def _create(session: "aiohttp.ClientSession") -> str:
+        gh = GitHubAPI(session, "llmauto", oauth_token=token)
+        repo_url = f"/repos/{repo_name}"
+        
+        # Build the commit on top of the target branch; inline tree content
+        # lets GitHub create the blob, saving a separate request
+        try:
+            branch = await gh.getitem(f"{repo_url}/branches/{target_branch}")
+        except BadRequest as e:
+            # Tell a missing repository apart from a missing branch, as the
+            # PyGithub path does
+            try:
+                branches = await gh.getitem(f"{repo_url}/branches?per_page=5")
+            except BadRequest as repo_error:
+                raise Exception(f"Repository '{repo_name}' not found or access denied. Error: {str(repo_error)}")
+            names = [b["name"] for b in branches]
+            raise Exception(f"Branch '{target_branch}' not found. Available branches: {', '.join(names)}. Error: {str(e)}")
+        tree = await gh.post(f"{repo_url}/git/trees", data={
+            "base_tree": branch["commit"]["commit"]["tree"]["sha"],
+            "tree": [{"path": filename, "mode": "100644", "type": "blob", "content": code}]
+        })
+        commit = await gh.post(f"{repo_url}/git/commits", data={
+            "message": commit_message,
+            "tree": tree["sha"],
+            "parents": [branch["commit"]["sha"]]
+        })
+        await gh.post(f"{repo_url}/git/refs", data={
+            "ref": f"refs/heads/{branch_name}",
+            "sha": commit["sha"]
+        })
+        pr = await gh.post(f"{repo_url}/pulls", data={
+            "title": pr_title,
+            "body": description,
+            "head": branch_name,
+            "base": target_branch
+        })
+        return pr["html_url"]
+    
+    try:
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(1)
+        async with semaphore:
+            if session is not None:
+                return await _create(session)
+            async with aiohttp.ClientSession() as new_session:
+                return await _create(new_session)
+    except Exception as e:
+        raise Exception(f"Failed to create GitHub PR: {str(e)}")
+
+
+async def acreate_quick_prs(changes: List[Dict[str, str]], max_concurrency: int = 10) -> List[Union[str, Exception]]:
+    """
+    Create several PRs concurrently, sharing one HTTP session.
+    
+    Args:
+        changes (list): Dicts with 'code', 'filename' and optional 'description' keys
+        max_concurrency (int): Maximum PRs in flight, to respect GitHub secondary rate limits
+    
+    Returns:
+        list: PR URL, or the Exception raised, for each change in input order
+    """
+    import aiohttp  # pip install aiohttp
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with aiohttp.ClientSession() as session:
+        return await asyncio.gather(
+            *[acreate_quick_pr(**change, session=session, semaphore=semaphore) for change in changes],
+            return_exceptions=True
+        )
\ No newline at end of file
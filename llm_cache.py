@@ -0,0 +1,216 @@
+"""
+LLM Response Cache
+
+Required installation:
+pip install langchain langchain-community
+
+Optional (semantic cache):
+pip install redis
+ollama pull nomic-embed-text
+
+Setup:
+1. Set REDIS_URL in your .env file (e.g. redis://localhost:6379) to enable the semantic cache
+2. Set LLM_CACHE_REFRESH=1 to ignore cached responses and store fresh ones
+3. Call configure_llm_cache() once before invoking any chains
+
+Usage example:
+   llm_cache, exact_cache = configure_llm_cache()
+   output = code_chain.invoke({"user_request": "build a todo API"})
+"""
+
+import hashlib
+import os
+import warnings
+from typing import Any, Optional, Sequence, Tuple
+
+from langchain.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import BaseMessage
+
+
+class TieredCache(BaseCache):
+    """
+    Two-level LLM cache: a cheap exact-match cache in front of a semantic cache.
+
+    Lookups try each cache in order and stop at the first hit. A hit in a
+    lower tier is copied into the tiers above it, so the next identical
+    request is served without touching the embedding model. A tier that
+    raises (e.g. Redis went away) is treated as a miss, so a cache outage
+    never breaks generation.
+    """
+
+    def __init__(self, caches: Sequence[BaseCache]):
+        self.caches = list(caches)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        for level, cache in enumerate(self.caches):
+            try:
+                result = cache.lookup(prompt, llm_string)
+            except Exception as e:
+                print(f"Warning: cache lookup failed ({str(e)})")
+                continue
+            if result is not None:
+                for upper in self.caches[:level]:
+                    self._update_tier(upper, prompt, llm_string, result)
+                return result
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        for cache in self.caches:
+            self._update_tier(cache, prompt, llm_string, return_val)
+
+    @staticmethod
+    def _update_tier(cache: BaseCache, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        try:
+            cache.update(prompt, llm_string, return_val)
+        except Exception as e:
+            print(f"Warning: cache update failed ({str(e)})")
+
+    def clear(self, **kwargs: Any) -> None:
+        for cache in self.caches:
+            cache.clear(**kwargs)
+
+
+class RequestKeyedCache(BaseCache):
+    """
+    Wrap a semantic cache so it only embeds the user's request.
+
+    Chat models pass the cache the whole serialized conversation, which is
+    mostly the fixed system prompt; embedding that would make unrelated short
+    requests look alike. This wrapper embeds only the last message and folds a
+    hash of the earlier messages into llm_string, so hits are only served for
+    prompts with the same instructions.
+    """
+
+    def __init__(self, cache: BaseCache):
+        self.cache = cache
+
+    def _split(self, prompt: str, llm_string: str) -> Tuple[str, str]:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # loads() emits a beta warning on every call
+                messages = loads(prompt)
+        except Exception:
+            return prompt, llm_string  # Plain (non-chat) prompt
+        if not isinstance(messages, list) or not messages or not all(isinstance(m, BaseMessage) for m in messages):
+            return prompt, llm_string
+        context = hashlib.sha256(dumps(messages[:-1]).encode()).hexdigest()
+        return str(messages[-1].content), f"{llm_string}---{context}"
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.cache.lookup(*self._split(prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.cache.update(*self._split(prompt, llm_string), return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear(**kwargs)
+
+
+def is_truncated(metadata: Optional[dict]) -> bool:
+    """
+    Check whether a response stopped because it hit the output token limit.
+    
+    Args:
+        metadata (dict, optional): Response metadata or generation info
+    
+    Returns:
+        bool: True for Ollama done_reason or OpenAI finish_reason 'length'
+    """
+    metadata = metadata or {}
+    return metadata.get("done_reason") == "length" or metadata.get("finish_reason") == "length"
+
+
+class CompleteOnlyCache(BaseCache):
+    """
+    Wrap a cache so truncated responses are never stored.
+
+    A response cut off at the token limit would otherwise be replayed for
+    every repeat of the request. With refresh=True lookups always miss, so
+    every request is generated again and the stored response replaced.
+    """
+
+    def __init__(self, cache: BaseCache, refresh: bool = False):
+        self.cache = cache
+        self.refresh = refresh
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if self.refresh:
+            return None
+        return self.cache.lookup(prompt, llm_string)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        for generation in return_val:
+            message = getattr(generation, "message", None)
+            if is_truncated(generation.generation_info) or is_truncated(getattr(message, "response_metadata", None)):
+                return
+        self.cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear(**kwargs)
+
+
+def configure_llm_cache(
+    database_path: str = ".llm_cache.db",
+    redis_url: Optional[str] = None,
+    embedding_model: str = "nomic-embed-text",
+    score_threshold: float = 0.1,
+    refresh: Optional[bool] = None
+) -> Tuple[BaseCache, BaseCache]:
+    """
+    Configure the global LangChain LLM cache.
+
+    An exact-match SQLite cache is always enabled. When a Redis URL is
+    available, a semantic cache keyed on the request text is added behind it
+    so paraphrased requests can be answered from earlier generations.
+
+    Args:
+        database_path (str): Path of the SQLite exact-match cache
+        redis_url (str, optional): Redis URL for the semantic cache. If None, will use REDIS_URL env var
+        embedding_model (str): Ollama embedding model used for the semantic cache
+        score_threshold (float): Maximum vector distance counted as a semantic hit
+        refresh (bool, optional): Skip cached responses but store fresh ones. If None, will use LLM_CACHE_REFRESH env var
+
+    Returns:
+        tuple: (installed cache, exact-match cache). Pass the exact-match cache
+        as `cache=` to models whose prompts must not be matched semantically,
+        such as numbered batch prompts where a reordered list embeds alike.
+    """
+    exact_cache = SQLiteCache(database_path=database_path)
+    cache: BaseCache = exact_cache
+
+    redis_url = redis_url or os.getenv('REDIS_URL')
+    if redis_url:
+        try:
+            import redis  # pip install redis
+            from langchain_community.cache import RedisSemanticCache
+            from langchain_ollama import OllamaEmbeddings
+
+            # RedisSemanticCache connects lazily, so check Redis and the
+            # embedding model now rather than failing on the first request
+            redis.Redis.from_url(redis_url).ping()
+            embedding = OllamaEmbeddings(model=embedding_model)
+            embedding.embed_query("semantic cache probe")
+
+            semantic_cache = RedisSemanticCache(
+                redis_url=redis_url,
+                embedding=embedding,
+                score_threshold=score_threshold
+            )
+            cache = TieredCache([cache, RequestKeyedCache(semantic_cache)])
+            print(f"✓ Semantic cache enabled: {redis_url}")
+        except Exception as e:
+            print(f"Warning: semantic cache disabled ({str(e)}). Using exact-match cache only.")
+
+    # Truncated responses are never stored, and refresh mode bypasses lookups
+    if refresh is None:
+        refresh = os.getenv('LLM_CACHE_REFRESH', '').lower() in ['1', 'true', 'yes']
+    if refresh:
+        print("Cache refresh enabled: cached responses will be regenerated.")
+    cache = CompleteOnlyCache(cache, refresh=refresh)
+    exact_only = CompleteOnlyCache(exact_cache, refresh=refresh)
+
+    set_llm_cache(cache)
+    return cache, exact_only
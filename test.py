@@ -0,0 +1,367 @@
+"""
+Checks for the code generator and PR helpers.
+
+Generation runs against a fake Ollama server started in-process, so no model,
+Redis or GitHub access is needed. Run with:
+python -m pytest -q test.py
+"""
+
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from langchain_core.caches import BaseCache, InMemoryCache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+import functions
+from llm_cache import CompleteOnlyCache, RequestKeyedCache, TieredCache, is_truncated
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code-app.py')
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Answer /api/chat with a fixed reply and record every request body."""
+
+    reply = "print('hello')"
+    done_reason = "stop"
+    chat_requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        if self.path == '/api/chat':
+            FakeOllama.chat_requests.append(body)
+            words = self.reply.split(' ')
+            for i, word in enumerate(words):
+                token = word if i == len(words) - 1 else word + ' '
+                self._send({"model": body["model"], "message": {"role": "assistant", "content": token}, "done": False})
+            self._send({"model": body["model"], "message": {"role": "assistant", "content": ""}, "done": True,
+                        "done_reason": self.done_reason, "eval_count": len(words)})
+        else:
+            self._send({"model": body.get("model"), "response": "", "done": True, "done_reason": "load"})
+
+    def _send(self, data):
+        self.wfile.write((json.dumps(data) + "\n").encode())
+
+    def log_message(self, *args):
+        pass
+
+
+app = None
+_server = None
+_workdir = None
+_cwd = None
+_env = None
+
+
+def setUpModule():
+    global app, _server, _workdir, _cwd, _env
+    _server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOllama)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+    # The app configures its cache in the working directory on import
+    _cwd = os.getcwd()
+    _workdir = tempfile.mkdtemp()
+    os.chdir(_workdir)
+    _env = mock.patch.dict(os.environ, {"OLLAMA_HOST": f"http://127.0.0.1:{_server.server_port}"})
+    _env.start()
+    for name in ['REDIS_URL', 'LLM_CACHE_REFRESH', 'LLM_BACKEND', 'OLLAMA_MODEL']:
+        os.environ.pop(name, None)
+
+    spec = importlib.util.spec_from_file_location("code_app", APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(app)
+
+
+def tearDownModule():
+    _server.shutdown()
+    _server.server_close()
+    _env.stop()
+    os.chdir(_cwd)
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+def run_quietly(coroutine):
+    """Run a coroutine, returning its result and everything it printed."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = asyncio.run(coroutine)
+    return result, output.getvalue()
+
+
+class BrokenCache(BaseCache):
+    def lookup(self, prompt, llm_string):
+        raise ConnectionError("redis is down")
+
+    def update(self, prompt, llm_string, return_val):
+        raise ConnectionError("redis is down")
+
+    def clear(self, **kwargs):
+        pass
+
+
+class HelperTest(unittest.TestCase):
+
+    def test_suggest_filename(self):
+        self.assertEqual(app.suggest_filename("Build a TODO API!"), "build_a_todo_api.py")
+        self.assertEqual(app.suggest_filename("???"), "microservice.py")
+        self.assertEqual(len(app.suggest_filename("x " * 100)), 40 + len(".py"))
+
+    def test_split_files(self):
+        output = ("Here you go:\n"
+                  "### FILE 1: todo_api.py\nprint(1)\n\n"
+                  "### FILE 2: user_api.py\nprint(2)\n")
+        self.assertEqual(app.split_files(output), [(1, "todo_api.py", "print(1)"), (2, "user_api.py", "print(2)")])
+        self.assertEqual(app.split_files("print(1)"), [])
+
+    def test_cap_request(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(app.cap_request("short"), "short")
+            self.assertEqual(len(app.cap_request("x" * 5000)), app.MAX_REQUEST_CHARS)
+            self.assertEqual(app.cap_request("abcdef", max_chars=3), "abc")
+
+
+class CacheTest(unittest.TestCase):
+
+    def test_tiered_cache_promotes_lower_hits(self):
+        upper, lower = InMemoryCache(), InMemoryCache()
+        lower.update("prompt", "llm", [Generation(text="code")])
+        cache = TieredCache([upper, lower])
+        self.assertEqual(cache.lookup("prompt", "llm")[0].text, "code")
+        self.assertEqual(upper.lookup("prompt", "llm")[0].text, "code")
+
+    def test_tiered_cache_skips_failing_tier(self):
+        exact = InMemoryCache()
+        cache = TieredCache([exact, BrokenCache()])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertIsNone(cache.lookup("prompt", "llm"))
+            cache.update("prompt", "llm", [Generation(text="code")])
+        self.assertEqual(exact.lookup("prompt", "llm")[0].text, "code")
+
+    def test_request_keyed_cache_embeds_only_the_request(self):
+        inner = InMemoryCache()
+        cache = RequestKeyedCache(inner)
+        prompt = dumps([SystemMessage(content="Write code"), HumanMessage(content="todo api")])
+        cache.update(prompt, "llm", [Generation(text="code")])
+
+        [(key_prompt, key_llm_string)] = inner._cache.keys()
+        self.assertEqual(key_prompt, "todo api")
+        self.assertTrue(key_llm_string.startswith("llm---"))
+
+        other_instructions = dumps([SystemMessage(content="Write tests"), HumanMessage(content="todo api")])
+        self.assertIsNone(cache.lookup(other_instructions, "llm"))
+        self.assertEqual(cache.lookup(prompt, "llm")[0].text, "code")
+
+        # Plain string prompts are passed through unchanged
+        cache.update("plain prompt", "llm", [Generation(text="text")])
+        self.assertEqual(inner.lookup("plain prompt", "llm")[0].text, "text")
+
+    def test_complete_only_cache_skips_truncated(self):
+        inner = InMemoryCache()
+        cache = CompleteOnlyCache(inner)
+        cut_off = ChatGeneration(message=AIMessage(content="def", response_metadata={"done_reason": "length"}))
+        cache.update("cut", "llm", [cut_off])
+        self.assertIsNone(inner.lookup("cut", "llm"))
+        cache.update("full", "llm", [Generation(text="code", generation_info={"done_reason": "stop"})])
+        self.assertEqual(cache.lookup("full", "llm")[0].text, "code")
+
+        refreshing = CompleteOnlyCache(inner, refresh=True)
+        self.assertIsNone(refreshing.lookup("full", "llm"))
+
+    def test_is_truncated(self):
+        self.assertTrue(is_truncated({"done_reason": "length"}))
+        self.assertTrue(is_truncated({"finish_reason": "length"}))
+        self.assertFalse(is_truncated({"done_reason": "stop"}))
+        self.assertFalse(is_truncated(None))
+
+
+class GenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        FakeOllama.reply = "print('hello')"
+        FakeOllama.done_reason = "stop"
+        FakeOllama.chat_requests.clear()
+
+    async def _generate(self, chain, inputs):
+        return await app.stream_output(app.start_generation(chain, inputs))
+
+    def test_repeated_request_is_served_from_cache(self):
+        first, printed = run_quietly(self._generate(app.code_chain, {"user_request": "cached todo api"}))
+        second, _ = run_quietly(self._generate(app.code_chain, {"user_request": "cached todo api"}))
+        self.assertEqual(first, ("print('hello')", False))
+        self.assertEqual(second, first)
+        self.assertIn("print('hello')", printed)
+        self.assertEqual(len(FakeOllama.chat_requests), 1)
+        self.assertTrue(os.path.exists(os.path.join(_workdir, ".llm_cache.db")))
+
+    def test_single_request_options(self):
+        run_quietly(self._generate(app.code_chain, {"user_request": "options todo api"}))
+        [request] = FakeOllama.chat_requests
+        self.assertEqual(request["options"]["num_ctx"], 2048)
+        self.assertEqual(request["options"]["num_predict"], 1024)
+        self.assertEqual(request["keep_alive"], "1h")
+
+    def test_batch_request_options(self):
+        run_quietly(self._generate(app.batch_chain, {"user_requests": "1. options batch"}))
+        [request] = FakeOllama.chat_requests
+        self.assertEqual(request["options"]["num_ctx"], 5120)
+        self.assertEqual(request["options"]["num_predict"], 4096)
+
+    def test_truncated_output_is_not_cached(self):
+        FakeOllama.done_reason = "length"
+        (_, truncated), printed = run_quietly(self._generate(app.code_chain, {"user_request": "truncated api"}))
+        self.assertTrue(truncated)
+        self.assertIn("token limit", printed)
+        run_quietly(self._generate(app.code_chain, {"user_request": "truncated api"}))
+        self.assertEqual(len(FakeOllama.chat_requests), 2)
+
+    def test_batch_pairs_files_with_requests(self):
+        FakeOllama.reply = "### FILE 2: users.py\nprint(2)\n### FILE 1: todos.py\nprint(1)"
+        create_prs = mock.AsyncMock(return_value=["url1", "url2"])
+        with mock.patch.object(app, 'acreate_quick_prs', create_prs), mock.patch('builtins.input', return_value='y'):
+            run_quietly(app.generate_batch(["pairing todos", "pairing users"]))
+        [files] = create_prs.call_args.args
+        self.assertEqual([f["filename"] for f in files], ["todos.py", "users.py"])
+        self.assertIn("pairing todos", files[0]["description"])
+        self.assertIn("pairing users", files[1]["description"])
+
+    def test_batch_refuses_mismatched_numbering(self):
+        FakeOllama.reply = "### FILE 1: todos.py\nprint(1)\n### FILE 3: extra.py\nprint(3)"
+        create_prs = mock.AsyncMock()
+        with mock.patch.object(app, 'acreate_quick_prs', create_prs), mock.patch('builtins.input') as ask:
+            _, printed = run_quietly(app.generate_batch(["numbering todos", "numbering users"]))
+        self.assertIn("expected file sections 1-2", printed)
+        ask.assert_not_called()
+        create_prs.assert_not_called()
+
+
+class MainLoopTest(unittest.TestCase):
+
+    def _run_main(self, answers):
+        single, batch = mock.AsyncMock(), mock.AsyncMock()
+        with mock.patch('builtins.input', side_effect=answers), \
+                mock.patch.object(app, 'warm_up_model', lambda: None), \
+                mock.patch.object(app, 'generate_single', single), \
+                mock.patch.object(app, 'generate_batch', batch):
+            _, printed = run_quietly(app.main())
+        return single, batch, printed
+
+    def test_single_batch_entry_gets_full_cap(self):
+        single, batch, _ = self._run_main(["n", "batch", "x" * 2000, "", ""])
+        single.assert_awaited_once_with("x" * 2000)
+        batch.assert_not_called()
+
+    def test_batch_entries_share_the_cap(self):
+        _, batch, _ = self._run_main(["n", "batch", "a" * 2000, "b" * 2000, "", ""])
+        [requests] = batch.call_args.args
+        self.assertEqual([len(r) for r in requests], [app.MAX_REQUEST_CHARS // app.MAX_BATCH_SIZE] * 2)
+
+    def test_failed_request_keeps_loop_running(self):
+        single, batch = mock.AsyncMock(side_effect=[ConnectionError("refused"), None]), mock.AsyncMock()
+        with mock.patch('builtins.input', side_effect=["n", "first", "second", ""]), \
+                mock.patch.object(app, 'warm_up_model', lambda: None), \
+                mock.patch.object(app, 'generate_single', single), \
+                mock.patch.object(app, 'generate_batch', batch):
+            _, printed = run_quietly(app.main())
+        self.assertEqual(single.await_count, 2)
+        self.assertIn("Failed to generate code: refused", printed)
+
+
+@unittest.skipUnless(shutil.which('git'), "git is not installed")
+class GitConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        self.repo = os.path.join(self.root, 'repo')
+        self._git('init', '-q', self.repo)
+        self._git('-C', self.repo, 'remote', 'add', 'origin', 'git@github.com:owner/my%repo.git')
+        self._git('-C', self.repo, 'config', '--add', 'remote.origin.fetch', '+refs/pull/*:refs/remotes/origin/pr/*')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _git(self, *args):
+        subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                       check=True, capture_output=True)
+
+    def test_config_found_from_subdirectory(self):
+        subdir = os.path.join(self.repo, 'src', 'app')
+        os.makedirs(subdir)
+        os.chdir(subdir)
+        self.assertEqual(functions._find_git_config(), os.path.join(self.repo, '.git', 'config'))
+        self.assertEqual(functions._read_origin_url(), 'git@github.com:owner/my%repo.git')
+
+    def test_worktree_uses_shared_config(self):
+        self._git('-C', self.repo, 'commit', '-q', '--allow-empty', '-m', 'init')
+        worktree = os.path.join(self.root, 'worktree')
+        self._git('-C', self.repo, 'worktree', 'add', '-q', worktree)
+        os.chdir(worktree)
+        self.assertEqual(os.path.realpath(functions._find_git_config()), os.path.join(self.repo, '.git', 'config'))
+
+    def test_repo_name_from_remote(self):
+        os.chdir(self.repo)
+        with mock.patch.dict(os.environ):
+            os.environ.pop('GITHUB_REPO', None)
+            self.assertEqual(functions._resolve_repo_name(), 'owner/my%repo')
+
+
+class PullRequestTest(unittest.TestCase):
+
+    def test_commit_calls(self):
+        from github.Repository import Repository
+        repo = mock.MagicMock(spec=Repository)
+        repo.create_pull.return_value.html_url = "https://github.com/owner/repo/pull/1"
+        with mock.patch.object(functions, '_get_repo', return_value=repo), \
+                contextlib.redirect_stdout(io.StringIO()):
+            url = functions.create_github_pr_with_code(
+                code="print(1)", filename="app.py", repo_name="owner/repo", pr_title="Add app.py",
+                pr_description="desc", branch_name="feature/app", commit_message="Add app.py",
+                github_token="token", target_branch="main")
+
+        self.assertEqual(url, "https://github.com/owner/repo/pull/1")
+        self.assertEqual([call[0] for call in repo.mock_calls if '.' not in call[0]],
+                         ['get_branch', 'get_git_commit', 'create_git_tree', 'create_git_commit', 'create_git_ref', 'create_pull'])
+        base_commit = repo.get_git_commit.return_value
+        repo.get_git_commit.assert_called_once_with(repo.get_branch.return_value.commit.sha)
+        self.assertEqual(repo.create_git_tree.call_args.kwargs["base_tree"], base_commit.tree)
+        self.assertEqual(repo.create_git_commit.call_args.args[2], [base_commit])
+
+    def test_async_missing_branch_lists_branches(self):
+        from gidgethub import BadRequest
+        from http import HTTPStatus
+
+        class FakeGitHubAPI:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            async def getitem(self, url):
+                if url.endswith('branches?per_page=5'):
+                    return [{"name": "main"}, {"name": "dev"}]
+                raise BadRequest(HTTPStatus.NOT_FOUND, "Branch not found")
+
+        env = {"GITHUB_TOKEN": "token", "GITHUB_REPO": "owner/repo", "DEFAULT_BRANCH": "missing"}
+        with mock.patch('gidgethub.aiohttp.GitHubAPI', FakeGitHubAPI), mock.patch.dict(os.environ, env):
+            with self.assertRaises(Exception) as raised:
+                asyncio.run(functions.acreate_quick_pr("print(1)", "app.py", session=object()))
+        self.assertIn("Branch 'missing' not found. Available branches: main, dev", str(raised.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()